@@ -30,24 +30,26 @@ def listar_anos(links):
     anos.sort(reverse=True)
     return anos
 
-def trimestres_encontrados():
+def trimestres_do_ano(ano, base_url=BASE_URL):
+    url_ano = urljoin(base_url, f"{ano}/")
+    links_ano = listar_links(url_ano)
+
+    # Filtra links que correspondem ao padrão de trimestre (ex: 1T2025)
+    # Ordena reverso para pegar 4T antes de 3T, etc.
+    trimes_ano = [link for link in links_ano if re.search(r"\d+T\d{4}", link, re.IGNORECASE)]
+    trimes_ano.sort(reverse=True)
+    return trimes_ano
+
+def trimestres_encontrados(base_url=BASE_URL):
     # 1. Obtém os links da pasta raiz para descobrir os anos
-    links_raiz = listar_links(BASE_URL)
+    links_raiz = listar_links(base_url)
     anos = listar_anos(links_raiz)
 
     trimestres_coletados = []
 
     # 2. Itera sobre os anos (do mais recente para o mais antigo)
     for ano in anos:
-        url_ano = urljoin(BASE_URL, f"{ano}/")
-        links_ano = listar_links(url_ano)
-
-        # Filtra links que correspondem ao padrão de trimestre (ex: 1T2025)
-        # Ordena reverso para pegar 4T antes de 3T, etc.
-        trimes_ano = [link for link in links_ano if re.search(r"\d+T\d{4}", link, re.IGNORECASE)]
-        trimes_ano.sort(reverse=True)
-
-        trimestres_coletados.extend(trimes_ano)
+        trimestres_coletados.extend(trimestres_do_ano(ano, base_url))
 
         # Se já temos 3 ou mais, paramos de procurar em anos anteriores
         if len(trimestres_coletados) >= 3:
@@ -1,6 +1,63 @@
 import pandas
 import os
 import zipfile
+from cache_colunar import carregar_colunar, remover_cache, COLS_DESCRICAO
+
+def validar_arquivo(caminho_completo):
+    """
+    Mantém o arquivo se ele contiver dados de eventos/sinistros; caso contrário, remove.
+    Retorna True se o arquivo foi mantido.
+    """
+    arquivo = os.path.basename(caminho_completo)
+    manter = False
+    try:
+        df = None
+        # Lista de possíveis nomes para a coluna de descrição (Normalização de estrutura),
+        # a mesma usada pelo 1_3.py na consolidação
+        colunas_possiveis = COLS_DESCRICAO
+        
+        if arquivo.lower().endswith(('.csv', '.txt')):
+            # Processamento INCREMENTAL para CSV/TXT (evita estouro de memória)
+            chunk_iter = None
+            try:
+                chunk_iter = pandas.read_csv(caminho_completo, sep=';', encoding='latin1', chunksize=10000, low_memory=False)
+            except:
+                chunk_iter = pandas.read_csv(caminho_completo, sep=',', chunksize=10000, low_memory=False)
+            
+            for chunk in chunk_iter:
+                # Normaliza colunas do pedaço atual
+                chunk.columns = [str(col).upper().strip() for col in chunk.columns]
+                
+                # Identifica automaticamente a coluna correta baseada na lista de sinônimos
+                coluna_alvo = next((col for col in chunk.columns if col in colunas_possiveis), None)
+                
+                if coluna_alvo:
+                    if chunk[coluna_alvo].astype(str).str.contains('eventos|sinistros', case=False, na=False).any():
+                        manter = True
+                        break # Encontrou? Para de ler o arquivo (otimização)
+
+        elif arquivo.lower().endswith(('.xlsx', '.xls')):
+            # Excel é lido linha a linha (somente leitura) e convertido uma única vez
+            # para o cache colunar, reaproveitado pelo 1_3.py sem reabrir a planilha
+            df = carregar_colunar(caminho_completo)
+            
+            coluna_alvo = next((col for col in df.columns if col in colunas_possiveis), None)
+            
+            if coluna_alvo:
+                if df[coluna_alvo].astype(str).str.contains('eventos|sinistros', case=False, na=False).any():
+                    manter = True
+
+    except Exception:
+        pass
+
+    if not manter:
+        print(f"Removendo arquivo sem dados relevantes: {arquivo}")
+        os.remove(caminho_completo)
+        remover_cache(caminho_completo)
+    else:
+        print(f"Arquivo validado: {arquivo}")
+
+    return manter
 
 def validar_arquivos(pasta_destino):
     print("Iniciando validação de dados nos arquivos extraídos...")
@@ -12,51 +69,22 @@ def validar_arquivos(pasta_destino):
         if os.path.isdir(caminho_completo):
             continue
 
-        manter = False
-        try:
-            df = None
-            # Lista de possíveis nomes para a coluna de descrição (Normalização de estrutura)
-            colunas_possiveis = ['DESCRICAO', 'DESC', 'EVENTO', 'HISTORICO', 'DETALHES', 'OBSERVACAO']
-            
-            if arquivo.lower().endswith(('.csv', '.txt')):
-                # Processamento INCREMENTAL para CSV/TXT (evita estouro de memória)
-                chunk_iter = None
-                try:
-                    chunk_iter = pandas.read_csv(caminho_completo, sep=';', encoding='latin1', chunksize=10000, low_memory=False)
-                except:
-                    chunk_iter = pandas.read_csv(caminho_completo, sep=',', chunksize=10000, low_memory=False)
-                
-                for chunk in chunk_iter:
-                    # Normaliza colunas do pedaço atual
-                    chunk.columns = [str(col).upper().strip() for col in chunk.columns]
-                    
-                    # Identifica automaticamente a coluna correta baseada na lista de sinônimos
-                    coluna_alvo = next((col for col in chunk.columns if col in colunas_possiveis), None)
-                    
-                    if coluna_alvo:
-                        if chunk[coluna_alvo].astype(str).str.contains('eventos|sinistros', case=False, na=False).any():
-                            manter = True
-                            break # Encontrou? Para de ler o arquivo (otimização)
-
-            elif arquivo.lower().endswith(('.xlsx', '.xls')):
-                # Excel geralmente cabe na memória, mas aplicamos a mesma lógica de colunas flexíveis
-                df = pandas.read_excel(caminho_completo)
-                df.columns = [str(col).upper().strip() for col in df.columns]
-                
-                coluna_alvo = next((col for col in df.columns if col in colunas_possiveis), None)
-                
-                if coluna_alvo:
-                    if df[coluna_alvo].astype(str).str.contains('eventos|sinistros', case=False, na=False).any():
-                        manter = True
+        validar_arquivo(caminho_completo)
 
-        except Exception:
-            pass
+def extrair_zip(caminho_zip, pasta_destino):
+    """
+    Extrai um ZIP para a pasta de destino e remove o arquivo original.
+    Retorna os caminhos dos arquivos extraídos no nível raiz da pasta de destino.
+    """
+    with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+        zip_ref.extractall(pasta_destino)
+        membros = [nome for nome in zip_ref.namelist()
+                   if not nome.endswith('/') and os.path.dirname(nome) == '']
 
-        if not manter:
-            print(f"Removendo arquivo sem dados relevantes: {arquivo}")
-            os.remove(caminho_completo)
-        else:
-            print(f"Arquivo validado: {arquivo}")
+    print(f"Removendo arquivo original: {os.path.basename(caminho_zip)}")
+    os.remove(caminho_zip)
+
+    return [os.path.join(pasta_destino, nome) for nome in membros]
 
 def extrair_e_limpar():
     # Define os caminhos das pastas
@@ -83,11 +111,7 @@ def extrair_e_limpar():
         # Verifica se é um arquivo zip válido
         if zipfile.is_zipfile(caminho_completo):
             print(f"Extraindo: {arquivo}")
-            with zipfile.ZipFile(caminho_completo, 'r') as zip_ref:
-                zip_ref.extractall(pasta_destino)
-            
-            print(f"Removendo arquivo original: {arquivo}")
-            os.remove(caminho_completo)
+            extrair_zip(caminho_completo, pasta_destino)
 
     validar_arquivos(pasta_destino)
 
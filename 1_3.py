@@ -3,6 +3,10 @@ import os
 import re
 import warnings
 import requests
+from dataset_particionado import gravar_tabela, TABELA_CONSOLIDADO
+from cache_colunar import (
+    carregar_colunar, COLS_DESCRICAO, COLS_REG_ANS, COLS_VALOR_FINAL, COLS_VALOR_INICIAL, COLS_DATA
+)
 
 # Suprimir avisos de compatibilidade futura do pandas para manter o log limpo
 warnings.simplefilter(action='ignore', category=FutureWarning)
@@ -16,24 +20,17 @@ ARQUIVO_SAIDA_CSV = "consolidado_despesas.csv"
 
 URL_CADOP = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv"
 
-# Colunas possíveis para normalização
-COLS_DESCRICAO = ['DESCRICAO', 'DESC', 'EVENTO', 'HISTORICO', 'DETALHES', 'OBSERVACAO', 'CONTA']
-COLS_REG_ANS = ['REG_ANS', 'REGISTRO', 'CODIGO', 'OPERADORA', 'CD_OPS']
-COLS_VALOR_FINAL = ['VL_SALDO_FINAL', 'SALDO_FINAL', 'VALOR', 'VL_SALDO', 'SALDO']
-COLS_VALOR_INICIAL = ['VL_SALDO_INICIAL', 'SALDO_INICIAL', 'VALOR_INICIAL', 'SALDO_ANTERIOR']
-COLS_DATA = ['DATA', 'DT_REF', 'DATA_REFERENCIA', 'DT_REFERENCIA', 'DT_COMPETENCIA']
 
-
-def baixar_cadop():
+def baixar_cadop(url=URL_CADOP):
     """Baixa o arquivo de cadastro de operadoras se ele não existir."""
     if not os.path.exists(PASTA_CADOP):
         os.makedirs(PASTA_CADOP)
 
     if not os.path.exists(ARQUIVO_CADOP):
-        print(f"Baixando CADOP de {URL_CADOP} para garantir a consolidação...")
+        print(f"Baixando CADOP de {url} para garantir a consolidação...")
         try:
             # Desabilita verificação SSL temporariamente se necessário
-            resp = requests.get(URL_CADOP, verify=False)
+            resp = requests.get(url, verify=False)
             resp.raise_for_status()
 
             # Salva o arquivo
@@ -60,13 +57,13 @@ def identificar_coluna(df, possiveis):
     return None
 
 
-def carregar_cadop():
+def carregar_cadop(url_cadop=URL_CADOP):
     """
     Carrega e trata o arquivo Relatorio_cadop.csv.
     Tratamento de Inconsistência: REG_ANS duplicados.
     """
     # Garante que o arquivo existe antes de tentar ler
-    if not baixar_cadop():
+    if not baixar_cadop(url_cadop):
         print("Aviso: Não foi possível obter o CADOP. O arquivo consolidado terá CNPJs vazios.")
         return None
 
@@ -123,15 +120,9 @@ def processar_arquivo_dados(caminho_arquivo, arquivo_nome):
         ano = int(match.group(2))
 
     try:
-        # Tenta ler CSV ou Excel
-        if arquivo_nome.lower().endswith(('.csv', '.txt')):
-            try:
-                df = pd.read_csv(caminho_arquivo, sep=';', encoding='latin1', low_memory=False)
-            except:
-                df = pd.read_csv(caminho_arquivo, sep=',', encoding='utf-8', low_memory=False)
-        elif arquivo_nome.lower().endswith(('.xlsx', '.xls')):
-            df = pd.read_excel(caminho_arquivo)
-        else:
+        # Lê CSV ou Excel a partir do cache colunar (o arquivo bruto só é lido na primeira vez)
+        df = carregar_colunar(caminho_arquivo)
+        if df is None:
             return None
 
         df = normalizar_colunas(df)
@@ -151,8 +142,9 @@ def processar_arquivo_dados(caminho_arquivo, arquivo_nome):
         df[col_reg] = pd.to_numeric(df[col_reg], errors='coerce')
 
         # Função auxiliar para limpar e converter valores
+        # Colunas de texto podem vir como object (arquivo bruto) ou str (cache Parquet)
         def limpar_valor(serie):
-            if serie.dtype == object:
+            if pd.api.types.is_string_dtype(serie.dtype):
                 return pd.to_numeric(serie.astype(str).str.replace('.', '', regex=False).str.replace(',', '.', regex=False), errors='coerce').fillna(0)
             return pd.to_numeric(serie, errors='coerce').fillna(0)
 
@@ -226,6 +218,13 @@ def main():
         print("Nenhum dado relevante encontrado para consolidação.")
         return
 
+    consolidar_e_salvar(dados_consolidados, cadop)
+
+
+def consolidar(dados_consolidados, cadop):
+    """
+    Concatena os agregados por arquivo e enriquece com o CADOP.
+    """
     # 3. Concatenar todos os dados
     df_final = pd.concat(dados_consolidados, ignore_index=True)
 
@@ -243,14 +242,28 @@ def main():
     df_final['RazaoSocial'] = df_final['RazaoSocial'].fillna('N/A')
 
     df_final = df_final[df_final['ValorDespesas'] != 0]
-    df_final = df_final[colunas_finais]
+    return df_final[colunas_finais]
+
+
+def consolidar_e_salvar(dados_consolidados, cadop, arquivo_saida=ARQUIVO_SAIDA_CSV,
+                        pasta_tabela=TABELA_CONSOLIDADO):
+    """
+    Consolida os agregados e salva o CSV consolidado e o dataset particionado por Ano/Trimestre.
+    """
+    df_final = consolidar(dados_consolidados, cadop)
 
     # 5. Salvar CSV
-    print(f"Salvando {ARQUIVO_SAIDA_CSV}...")
-    df_final.to_csv(ARQUIVO_SAIDA_CSV, index=False, sep=';', encoding='utf-8')
+    print(f"Salvando {arquivo_saida}...")
+    df_final.to_csv(arquivo_saida, index=False, sep=';', encoding='utf-8')
 
-    print("Processo concluído com sucesso.")
+    # 6. Salvar dataset particionado (leitura seletiva por trimestre, UF ou CNPJ)
+    try:
+        gravar_tabela(df_final, pasta_tabela)
+        print(f"Dataset particionado salvo em: {pasta_tabela}")
+    except Exception as e:
+        print(f"Aviso: não foi possível gravar o dataset particionado: {e}")
 
+    print("Processo concluído com sucesso.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
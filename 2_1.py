@@ -38,18 +38,11 @@ def validar_cnpj(cnpj):
     return True
 
 
-def processar_validacao():
-    print("Iniciando validação estrita de dados...")
-
-    if not os.path.exists(ARQUIVO_ENTRADA):
-        print(f"Arquivo de entrada não encontrado: {ARQUIVO_ENTRADA}")
-        print("Execute o script 1_3.py primeiro.")
-        return
-
-    # Carrega o CSV consolidado
-    # dtype=str para CNPJ para evitar perda de zeros à esquerda
-    df = pd.read_csv(ARQUIVO_ENTRADA, sep=';', encoding='utf-8', dtype={'CNPJ': str})
-
+def validar_dataframe(df):
+    """
+    Aplica as regras de validação (CNPJ, Razão Social e valor positivo).
+    Retorna (válidos, inconsistentes), com o motivo do erro nos inconsistentes.
+    """
     # Converte ValorDespesas para numérico
     df['ValorDespesas'] = pd.to_numeric(df['ValorDespesas'], errors='coerce')
 
@@ -80,6 +73,23 @@ def processar_validacao():
         df_erros.loc[~mask_razao_social, 'Motivo_Erro'] += 'Razão Social Vazia/Inválida; '
         df_erros.loc[~mask_valor_positivo, 'Motivo_Erro'] += 'Valor Não Positivo; '
 
+    return df_validos, df_erros
+
+
+def processar_validacao():
+    print("Iniciando validação estrita de dados...")
+
+    if not os.path.exists(ARQUIVO_ENTRADA):
+        print(f"Arquivo de entrada não encontrado: {ARQUIVO_ENTRADA}")
+        print("Execute o script 1_3.py primeiro.")
+        return
+
+    # Carrega o CSV consolidado
+    # dtype=str para CNPJ para evitar perda de zeros à esquerda
+    df = pd.read_csv(ARQUIVO_ENTRADA, sep=';', encoding='utf-8', dtype={'CNPJ': str})
+
+    df_validos, df_erros = validar_dataframe(df)
+
     # Salvamento
 
     print(f"Total de registros processados: {len(df)}")
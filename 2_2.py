@@ -2,6 +2,7 @@ import pandas as pd
 import os
 import re
 import requests
+from dataset_particionado import gravar_tabela, TABELA_ENRIQUECIDO
 
 # Configurações de Caminhos
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -13,16 +14,16 @@ ARQUIVO_SAIDA = os.path.join(BASE_DIR, "consolidado_enriquecido.csv")
 URL_CADOP = "https://dadosabertos.ans.gov.br/FTP/PDA/operadoras_de_plano_de_saude_ativas/Relatorio_cadop.csv"
 
 
-def baixar_cadop():
+def baixar_cadop(url=URL_CADOP):
     """Baixa o arquivo de cadastro de operadoras se ele não existir."""
     if not os.path.exists(PASTA_CADOP):
         os.makedirs(PASTA_CADOP)
     
     if not os.path.exists(ARQUIVO_CADOP):
-        print(f"Baixando CADOP de {URL_CADOP}...")
+        print(f"Baixando CADOP de {url}...")
         try:
             # Desabilita verificação SSL temporariamente se necessário (comum em gov.br)
-            resp = requests.get(URL_CADOP, verify=False)
+            resp = requests.get(url, verify=False)
             resp.raise_for_status()
             
             # Detecta encoding (geralmente é latin1 ou utf-8, vamos tentar salvar direto)
@@ -40,14 +41,14 @@ def limpar_cnpj(cnpj):
     return re.sub(r'[^0-9]', '', str(cnpj))
 
 
-def carregar_cadop_para_enriquecimento():
+def carregar_cadop_para_enriquecimento(url_cadop=URL_CADOP):
     """
     Carrega o CADOP selecionando apenas as colunas necessárias para o join.
     Trata duplicatas de CNPJ para evitar explosão de linhas no merge.
     """
     print("Carregando e preparando CADOP...")
     
-    if not baixar_cadop():
+    if not baixar_cadop(url_cadop):
         return None
 
     try:
@@ -91,6 +92,27 @@ def carregar_cadop_para_enriquecimento():
         return None
 
 
+def enriquecer(df_dados, df_cadop):
+    """
+    Enriquece os dados financeiros validados com RegistroANS, Modalidade e UF do CADOP.
+    """
+    df_dados = df_dados.copy()
+    df_dados['CNPJ'] = df_dados['CNPJ'].apply(limpar_cnpj)
+
+    # 3. Realizar o Join (Merge)
+    # Estratégia: Left Join
+    # Justificativa: Prioridade para os dados financeiros. Se não houver cadastro,
+    # mantemos o dado financeiro e marcamos o cadastro como não encontrado.
+    df_final = pd.merge(df_dados, df_cadop, on='CNPJ', how='left')
+
+    # 4. Tratamento de Registros sem Match
+    cols_novas = ['RegistroANS', 'Modalidade', 'UF']
+    for col in cols_novas:
+        df_final[col] = df_final[col].fillna('N/A')
+
+    return df_final
+
+
 def main():
     print("Iniciando processo de enriquecimento de dados (Join)...")
 
@@ -101,7 +123,6 @@ def main():
 
     # 1. Carregar Dados Consolidados (Lado Esquerdo do Join)
     df_dados = pd.read_csv(ARQUIVO_DADOS_VALIDADOS, sep=';', encoding='utf-8', dtype={'CNPJ': str})
-    df_dados['CNPJ'] = df_dados['CNPJ'].apply(limpar_cnpj)
 
     print(f"Registros financeiros carregados: {len(df_dados)}")
 
@@ -111,16 +132,8 @@ def main():
     if df_cadop is None:
         return
 
-    # 3. Realizar o Join (Merge)
-    # Estratégia: Left Join
-    # Justificativa: Prioridade para os dados financeiros. Se não houver cadastro,
-    # mantemos o dado financeiro e marcamos o cadastro como não encontrado.
-    df_final = pd.merge(df_dados, df_cadop, on='CNPJ', how='left')
-
-    # 4. Tratamento de Registros sem Match
-    cols_novas = ['RegistroANS', 'Modalidade', 'UF']
-    for col in cols_novas:
-        df_final[col] = df_final[col].fillna('N/A')
+    # 3 e 4. Join com o cadastro e tratamento de registros sem match
+    df_final = enriquecer(df_dados, df_cadop)
 
     # Estatísticas de Qualidade
     sem_match = df_final[df_final['RegistroANS'] == 'N/A'].shape[0]
@@ -131,6 +144,14 @@ def main():
     df_final.to_csv(ARQUIVO_SAIDA, index=False, sep=';', encoding='utf-8')
     print(f"Arquivo final salvo em: {ARQUIVO_SAIDA}")
 
+    # 6. Salvar dataset particionado por Ano/Trimestre (leitura seletiva no 2_3.py)
+    try:
+        gravar_tabela(df_final, TABELA_ENRIQUECIDO)
+        print(f"Dataset particionado salvo em: {TABELA_ENRIQUECIDO}")
+    except Exception as e:
+        # O manifesto fica mais antigo que o CSV, então o 2_3.py volta a usar o CSV
+        print(f"Aviso: não foi possível gravar o dataset particionado ({e}). O 2_3.py usará o CSV.")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,41 +1,145 @@
 import pandas as pd
+import argparse
 import os
+from dataset_particionado import (
+    iterar_tabela, ler_manifesto, listar_particoes, ler_trimestre, TABELA_ENRIQUECIDO
+)
 
 # Configurações de Caminhos
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 ARQUIVO_ENTRADA = os.path.join(BASE_DIR, "consolidado_enriquecido.csv")
 ARQUIVO_SAIDA_CSV = os.path.join(BASE_DIR, "despesas_agregadas.csv")
 
+# Quantidade de linhas lidas por vez do arquivo enriquecido
+TAMANHO_BLOCO = 100000
+CHAVES_AGRUPAMENTO = ['RazaoSocial', 'UF']
+COLUNAS_NECESSARIAS = CHAVES_AGRUPAMENTO + ['ValorDespesas']
+
+
+def estatisticas_bloco(bloco):
+    """Calcula contagem, soma, média e soma dos quadrados dos desvios (M2) por operadora/UF."""
+    grupos = bloco.groupby(CHAVES_AGRUPAMENTO)['ValorDespesas']
+    contagem = grupos.count()
+    return pd.DataFrame({
+        'n': contagem,
+        'soma': grupos.sum(),
+        'media': grupos.mean(),
+        'm2': grupos.var(ddof=0) * contagem
+    })
+
+
+def combinar_estatisticas(a, b):
+    """
+    Combina as estatísticas parciais de dois blocos (algoritmo paralelo de Chan),
+    permitindo calcular média e desvio padrão sem carregar o arquivo inteiro.
+    """
+    a, b = a.align(b, fill_value=0)
+    n = a['n'] + b['n']
+    delta = b['media'] - a['media']
+    return pd.DataFrame({
+        'n': n,
+        'soma': a['soma'] + b['soma'],
+        'media': a['media'] + delta * b['n'] / n,
+        'm2': a['m2'] + b['m2'] + delta ** 2 * a['n'] * b['n'] / n
+    })
+
+
+def escolher_particoes(inicio=None, fim=None):
+    """
+    Decide se a leitura usa o dataset enriquecido e quais partições.
+    Retorna None para ler o CSV, ou a lista de (ano, trimestre) a ler do dataset.
+
+    - Sem intervalo: usa apenas as partições gravadas pela última execução do 2_2.py
+      (manifesto), desde que o dataset não seja mais antigo que o CSV enriquecido.
+    - Com intervalo (--de/--ate): usa todas as partições do dataset no intervalo,
+      incluindo o histórico carregado pelo backfill.
+    """
+    manifesto = ler_manifesto(TABELA_ENRIQUECIDO)
+    desatualizado = os.path.exists(ARQUIVO_ENTRADA) and \
+        (manifesto is None or manifesto[1] < os.path.getmtime(ARQUIVO_ENTRADA))
+
+    if inicio or fim:
+        particoes = [(ano, trimestre) for ano, trimestre, _ in listar_particoes(TABELA_ENRIQUECIDO, inicio, fim)]
+        if particoes:
+            if desatualizado:
+                print("Aviso: o dataset enriquecido é mais antigo que o CSV; os trimestres recentes podem estar desatualizados.")
+            return particoes
+
+    if manifesto is None or desatualizado:
+        return None
+    return manifesto[0]
+
+
+def ler_blocos(inicio=None, fim=None, ufs=None):
+    """
+    Gera blocos apenas com as colunas necessárias para a agregação.
+    Usa o dataset particionado quando disponível: partições fora da seleção e
+    row groups cujo min/max de UF não atende ao filtro nem são lidos.
+    Caso contrário, lê o CSV enriquecido em blocos e filtra as linhas.
+    """
+    particoes = escolher_particoes(inicio, fim)
+    if particoes is not None:
+        metricas = {}
+        filtros = {'UF': ufs} if ufs else None
+        yield from iterar_tabela(TABELA_ENRIQUECIDO, COLUNAS_NECESSARIAS, inicio, fim, filtros, metricas, particoes)
+        print(f"Partições lidas: {metricas['particoes_lidas']} de {metricas['particoes_total']} "
+              f"({metricas['bytes_lidos']} de {metricas['bytes_total']} bytes)")
+        return
 
-def main():
+    colunas = COLUNAS_NECESSARIAS + ['Ano', 'Trimestre'] if (inicio or fim) else COLUNAS_NECESSARIAS
+    for bloco in pd.read_csv(ARQUIVO_ENTRADA, sep=';', encoding='utf-8', usecols=colunas, chunksize=TAMANHO_BLOCO):
+        if inicio or fim:
+            chave = bloco['Ano'] * 10 + bloco['Trimestre']
+            dentro = pd.Series(True, index=bloco.index)
+            if inicio:
+                dentro &= chave >= inicio[0] * 10 + inicio[1]
+            if fim:
+                dentro &= chave <= fim[0] * 10 + fim[1]
+            bloco = bloco[dentro]
+        if ufs:
+            bloco = bloco[bloco['UF'].isin(ufs)]
+        yield bloco[COLUNAS_NECESSARIAS]
+
+
+def gerar_agregado(inicio=None, fim=None, ufs=None):
     print("Iniciando agregação e análise estatística...")
 
-    if not os.path.exists(ARQUIVO_ENTRADA):
+    if escolher_particoes(inicio, fim) is None and not os.path.exists(ARQUIVO_ENTRADA):
         print(f"Arquivo de entrada {ARQUIVO_ENTRADA} não encontrado.")
         print("Por favor, execute o script 2_2.py primeiro.")
         return
 
-    # 1. Carregar Dados Enriquecidos
+    # 1. Carregar Dados Enriquecidos e 2. Agregação por Razão Social e UF
+    # Cálculos solicitados: Total, Média (por trimestre) e Desvio Padrão
+    # Os dados são lidos em blocos (um por partição ou por pedaço do CSV) e as estatísticas
+    # parciais são combinadas, mantendo o uso de memória estável mesmo com o histórico completo.
+    print("Calculando estatísticas...")
+
+    estatisticas = None
+    total_registros = 0
     try:
-        df = pd.read_csv(ARQUIVO_ENTRADA, sep=';', encoding='utf-8')
+        for bloco in ler_blocos(inicio, fim, ufs):
+            # Garantir que ValorDespesas é numérico
+            bloco['ValorDespesas'] = pd.to_numeric(bloco['ValorDespesas'], errors='coerce').fillna(0)
+            total_registros += len(bloco)
+
+            parcial = estatisticas_bloco(bloco)
+            estatisticas = parcial if estatisticas is None else combinar_estatisticas(estatisticas, parcial)
     except Exception as e:
-        print(f"Erro ao ler o arquivo CSV: {e}")
+        print(f"Erro ao ler os dados enriquecidos: {e}")
         return
 
-    # Garantir que ValorDespesas é numérico
-    df['ValorDespesas'] = pd.to_numeric(df['ValorDespesas'], errors='coerce').fillna(0)
-
-    print(f"Registros carregados: {len(df)}")
+    print(f"Registros carregados: {total_registros}")
 
-    # 2. Agregação por Razão Social e UF
-    # Cálculos solicitados: Total, Média (por trimestre) e Desvio Padrão
-    print("Calculando estatísticas...")
+    if estatisticas is None:
+        print("Nenhum registro para agregar.")
+        return
 
-    agregado = df.groupby(['RazaoSocial', 'UF'])['ValorDespesas'].agg(
-        TotalDespesas='sum',
-        MediaTrimestral='mean',
-        DesvioPadrao='std'
-    ).reset_index()
+    agregado = pd.DataFrame({
+        'TotalDespesas': estatisticas['soma'],
+        'MediaTrimestral': estatisticas['media'],
+        'DesvioPadrao': (estatisticas['m2'] / (estatisticas['n'] - 1)).where(estatisticas['n'] > 1) ** 0.5
+    }).reset_index()
 
     # Tratamento para Desvio Padrão NaN (ocorre quando há apenas 1 registro/trimestre para a operadora)
     # Preenchemos com 0.0 pois não há variação com um único dado.
@@ -44,7 +148,8 @@ def main():
     # 3. Ordenação (Trade-off Técnico)
     # Estratégia: Ordenar por Total de Despesas Decrescente.
     # Justificativa: Destacar as operadoras com maior impacto financeiro no topo do relatório.
-    # O uso de sort_values em memória é eficiente para este volume de dados.
+    # O agregado tem uma linha por operadora/UF, então sort_values em memória continua eficiente
+    # mesmo quando o arquivo de entrada cobre muitos anos.
     agregado = agregado.sort_values(by='TotalDespesas', ascending=False)
 
     # Formatação opcional para melhor leitura (arredondamento)
@@ -60,5 +165,15 @@ def main():
     print(f"Análise concluída.")
 
 
+def main():
+    parser = argparse.ArgumentParser(description="Agrega as despesas por operadora e UF.")
+    parser.add_argument("--de", type=ler_trimestre, help="Primeiro trimestre considerado (AAAA-T)")
+    parser.add_argument("--ate", type=ler_trimestre, help="Último trimestre considerado (AAAA-T)")
+    parser.add_argument("--uf", nargs="+", help="Considera apenas as UFs informadas (ex: --uf SP RJ)")
+    args = parser.parse_args()
+
+    gerar_agregado(args.de, args.ate, args.uf)
+
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
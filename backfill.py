@@ -0,0 +1,195 @@
+import argparse
+import importlib
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataset_particionado import (
+    caminho_particao, gravar_particao, ler_trimestre,
+    PASTA_DATASET, TABELA_CONSOLIDADO, TABELA_ENRIQUECIDO, TABELA_INCONSISTENCIAS
+)
+
+# Os scripts das etapas começam com dígito, por isso são importados via importlib
+etapa_download = importlib.import_module("1_1")
+etapa_extracao = importlib.import_module("1_2")
+etapa_consolidacao = importlib.import_module("1_3")
+etapa_validacao = importlib.import_module("2_1")
+etapa_enriquecimento = importlib.import_module("2_2")
+
+# As partições são gravadas diretamente nos datasets consolidado, enriquecido e de
+# inconsistências (ver dataset_particionado.py); o marcador fica na partição consolidada
+TABELAS = {
+    'consolidado': os.path.basename(TABELA_CONSOLIDADO),
+    'enriquecido': os.path.basename(TABELA_ENRIQUECIDO),
+    'inconsistencias': os.path.basename(TABELA_INCONSISTENCIAS)
+}
+NOME_PASTA_TRABALHO = "_trabalho"
+MARCADOR_SUCESSO = "_SUCESSO"
+
+NUM_WORKERS = 4
+
+
+def pastas_tabelas(pasta_dataset):
+    """Caminho de cada tabela gravada pelo backfill dentro da pasta raiz dos datasets."""
+    return {nome: os.path.join(pasta_dataset, tabela) for nome, tabela in TABELAS.items()}
+
+
+def particao_concluida(pasta_consolidado, ano, trimestre):
+    """
+    Uma partição só é considerada concluída quando possui o marcador de sucesso, gravado
+    depois das etapas de consolidação, validação e enriquecimento.
+    """
+    return os.path.exists(os.path.join(caminho_particao(pasta_consolidado, ano, trimestre), MARCADOR_SUCESSO))
+
+
+def listar_particoes(inicio, fim, base_url=etapa_download.BASE_URL):
+    """
+    Lista os trimestres disponíveis na ANS dentro do intervalo [inicio, fim].
+    Retorna tuplas (ano, trimestre, link) em ordem cronológica.
+    """
+    anos = etapa_download.listar_anos(etapa_download.listar_links(base_url))
+
+    particoes = {}
+    for ano in anos:
+        if not inicio[0] <= int(ano) <= fim[0]:
+            continue
+
+        for link in etapa_download.trimestres_do_ano(ano, base_url):
+            match = re.search(r"(\d)T(\d{4})", link.split("/")[-1], re.IGNORECASE)
+            if not match:
+                continue
+
+            chave = (int(match.group(2)), int(match.group(1)))
+            # Mantém apenas um arquivo por trimestre
+            if inicio <= chave <= fim and chave not in particoes:
+                particoes[chave] = link
+
+    return [(ano, trimestre, link) for (ano, trimestre), link in sorted(particoes.items())]
+
+
+def processar_particao(link, ano, trimestre, pastas, cadop, cadop_enriquecimento):
+    """
+    Baixa, extrai, consolida, valida e enriquece um único trimestre (etapas 1.1 a 2.2),
+    gravando o resultado de cada etapa na partição correspondente de cada dataset.
+    Executado em um processo separado; a memória usada é limitada a um trimestre.
+    """
+    pasta_particao = caminho_particao(pastas['consolidado'], ano, trimestre)
+    pasta_trabalho = os.path.join(pastas['consolidado'], NOME_PASTA_TRABALHO, f"{trimestre}T{ano}")
+    pasta_extraidos = os.path.join(pasta_trabalho, "extraidos")
+
+    # Descarta restos de uma execução interrompida desta mesma partição
+    shutil.rmtree(pasta_trabalho, ignore_errors=True)
+    os.makedirs(pasta_extraidos)
+
+    try:
+        caminho_zip = etapa_download.baixar_trimestres(link, pasta_trabalho)
+
+        dados_consolidados = []
+        for membro in etapa_extracao.extrair_zip(caminho_zip, pasta_extraidos):
+            if not etapa_extracao.validar_arquivo(membro):
+                continue
+
+            df_agregado = etapa_consolidacao.processar_arquivo_dados(membro, os.path.basename(membro))
+            if df_agregado is not None:
+                # A partição é definida pelo nome do ZIP, que contém um único trimestre
+                df_agregado['Ano'] = ano
+                df_agregado['Trimestre'] = trimestre
+                dados_consolidados.append(df_agregado)
+
+        # Uma tentativa anterior (interrompida ou com outro CADOP) pode ter deixado esta
+        # partição em alguma tabela; o reprocessamento substitui o trimestre por completo
+        for pasta_tabela in pastas.values():
+            shutil.rmtree(caminho_particao(pasta_tabela, ano, trimestre), ignore_errors=True)
+
+        # Trimestres sem dados relevantes também são marcados, para não serem reprocessados
+        if dados_consolidados:
+            df_particao = etapa_consolidacao.consolidar(dados_consolidados, cadop)
+            gravar_particao(df_particao, pastas['consolidado'], ano, trimestre)
+
+            # Validação (2.1) e enriquecimento (2.2) da mesma partição
+            df_validos, df_erros = etapa_validacao.validar_dataframe(df_particao.copy())
+            if not df_erros.empty:
+                gravar_particao(df_erros, pastas['inconsistencias'], ano, trimestre)
+            if not df_validos.empty:
+                df_enriquecido = etapa_enriquecimento.enriquecer(df_validos, cadop_enriquecimento)
+                gravar_particao(df_enriquecido, pastas['enriquecido'], ano, trimestre)
+
+            print(f"Partição {trimestre}T{ano} gravada com {len(df_particao)} registros "
+                  f"({len(df_validos)} válidos, {len(df_erros)} inconsistentes).")
+
+        os.makedirs(pasta_particao, exist_ok=True)
+        open(os.path.join(pasta_particao, MARCADOR_SUCESSO), 'w').close()
+    finally:
+        shutil.rmtree(pasta_trabalho, ignore_errors=True)
+
+
+def executar_backfill(inicio, fim, base_url=etapa_download.BASE_URL, pasta_dataset=PASTA_DATASET,
+                      num_workers=NUM_WORKERS, url_cadop=etapa_consolidacao.URL_CADOP):
+    """
+    Processa todos os trimestres do intervalo, partição por partição, em paralelo.
+    Partições já concluídas em execuções anteriores são puladas.
+    Retorna o número de partições que falharam.
+    """
+    inicio_execucao = time.time()
+    print(f"Iniciando backfill de {inicio[1]}T{inicio[0]} a {fim[1]}T{fim[0]}...")
+
+    pastas = pastas_tabelas(pasta_dataset)
+    particoes = listar_particoes(inicio, fim, base_url)
+    pendentes = [p for p in particoes if not particao_concluida(pastas['consolidado'], p[0], p[1])]
+    print(f"Trimestres encontrados: {len(particoes)} | Já concluídos: {len(particoes) - len(pendentes)} | "
+          f"Pendentes: {len(pendentes)}")
+
+    if not pendentes:
+        return 0
+
+    # O CADOP é carregado uma única vez (nos dois formatos usados) e enviado a cada worker
+    cadop = etapa_consolidacao.carregar_cadop(url_cadop)
+    cadop_enriquecimento = etapa_enriquecimento.carregar_cadop_para_enriquecimento(url_cadop)
+    if cadop_enriquecimento is None:
+        print("Não foi possível carregar o CADOP para o enriquecimento. Backfill interrompido.")
+        return len(pendentes)
+
+    falhas = 0
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futuros = {
+            executor.submit(processar_particao, link, ano, trimestre, pastas, cadop,
+                            cadop_enriquecimento): (ano, trimestre)
+            for ano, trimestre, link in pendentes
+        }
+        for futuro in as_completed(futuros):
+            ano, trimestre = futuros[futuro]
+            try:
+                futuro.result()
+                print(f"Partição {trimestre}T{ano} concluída.")
+            except Exception as e:
+                falhas += 1
+                print(f"Erro na partição {trimestre}T{ano}: {e}")
+
+    shutil.rmtree(os.path.join(pastas['consolidado'], NOME_PASTA_TRABALHO), ignore_errors=True)
+    print(f"Backfill concluído em {time.time() - inicio_execucao:.1f}s. Partições com falha: {falhas}")
+    if falhas:
+        print("Execute novamente para reprocessar apenas as partições pendentes.")
+    return falhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carrega o histórico completo de demonstrações contábeis.")
+    parser.add_argument("--de", type=ler_trimestre, required=True, help="Primeiro trimestre (AAAA-T)")
+    parser.add_argument("--ate", type=ler_trimestre, required=True, help="Último trimestre (AAAA-T)")
+    parser.add_argument("--url", default=etapa_download.BASE_URL,
+                        help="URL base das demonstrações contábeis")
+    parser.add_argument("--cadop", default=etapa_consolidacao.URL_CADOP,
+                        help="URL do Relatorio_cadop.csv (usado apenas se o arquivo local não existir)")
+    parser.add_argument("--saida", default=PASTA_DATASET, help="Pasta raiz dos datasets particionados")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS, help="Número de processos em paralelo")
+    args = parser.parse_args()
+
+    if args.de > args.ate:
+        parser.error("--de deve ser anterior ou igual a --ate")
+
+    executar_backfill(args.de, args.ate, args.url, args.saida, args.workers, args.cadop)
+
+
+if __name__ == "__main__":
+    main()
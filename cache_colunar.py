@@ -0,0 +1,256 @@
+import pandas as pd
+import os
+
+# Pasta (relativa à pasta do arquivo de origem) onde ficam as cópias colunares
+NOME_PASTA_CACHE = "cache_colunar"
+
+# Colunas possíveis para normalização (compartilhadas entre 1_2.py e 1_3.py)
+COLS_DESCRICAO = ['DESCRICAO', 'DESC', 'EVENTO', 'HISTORICO', 'DETALHES', 'OBSERVACAO', 'CONTA']
+COLS_REG_ANS = ['REG_ANS', 'REGISTRO', 'CODIGO', 'OPERADORA', 'CD_OPS']
+COLS_VALOR_FINAL = ['VL_SALDO_FINAL', 'SALDO_FINAL', 'VALOR', 'VL_SALDO', 'SALDO']
+COLS_VALOR_INICIAL = ['VL_SALDO_INICIAL', 'SALDO_INICIAL', 'VALOR_INICIAL', 'SALDO_ANTERIOR']
+COLS_DATA = ['DATA', 'DT_REF', 'DATA_REFERENCIA', 'DT_REFERENCIA', 'DT_COMPETENCIA']
+
+# Apenas estas colunas são lidas dos arquivos brutos; as demais são descartadas na leitura
+COLUNAS_NECESSARIAS = set(COLS_DESCRICAO + COLS_REG_ANS + COLS_VALOR_FINAL + COLS_VALOR_INICIAL + COLS_DATA)
+
+# Linhas de planilha mantidas em memória antes de cada gravação no Parquet (um row group por lote)
+LINHAS_POR_LOTE = 10000
+
+
+def normalizar_nome_coluna(col):
+    """Normaliza um nome de coluna para maiúsculo e sem espaços nas bordas."""
+    return str(col).upper().strip()
+
+
+def caminho_cache(caminho_arquivo):
+    """Retorna o caminho do arquivo Parquet que guarda a versão colunar do arquivo."""
+    pasta = os.path.join(os.path.dirname(caminho_arquivo), NOME_PASTA_CACHE)
+    return os.path.join(pasta, os.path.basename(caminho_arquivo) + ".parquet")
+
+
+def ler_cache(caminho_arquivo):
+    """Retorna o DataFrame em cache, ou None se ele não existir ou estiver desatualizado."""
+    cache = caminho_cache(caminho_arquivo)
+    if not os.path.exists(cache):
+        return None
+
+    # Cache mais antigo que o arquivo de origem (ex: nova extração) é descartado
+    if os.path.exists(caminho_arquivo) and os.path.getmtime(cache) < os.path.getmtime(caminho_arquivo):
+        return None
+
+    try:
+        return pd.read_parquet(cache)
+    except Exception:
+        return None
+
+
+def _texto_preservando_nulos(df, colunas):
+    """Converte as colunas para texto, preservando os valores ausentes."""
+    for col in colunas:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    return df
+
+
+def salvar_cache(df, caminho_arquivo):
+    """Grava o DataFrame em formato Parquet de forma atômica."""
+    cache = caminho_cache(caminho_arquivo)
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+
+    # Colunas com tipos mistos (ex: números e textos) não são aceitas pelo Parquet;
+    # convertemos para texto preservando os valores ausentes.
+    df = _texto_preservando_nulos(df.copy(), [col for col in df.columns if df[col].dtype == object])
+
+    temporario = cache + ".tmp"
+    df.to_parquet(temporario, index=False)
+    os.replace(temporario, cache)
+
+
+def remover_cache(caminho_arquivo):
+    """Remove a versão colunar do arquivo, se existir."""
+    cache = caminho_cache(caminho_arquivo)
+    if os.path.exists(cache):
+        os.remove(cache)
+
+
+def _esquema_lote(df):
+    """
+    Esquema Arrow de um lote de linhas. Colunas com tipos mistos viram texto, como no
+    salvar_cache, e todo texto usa o mesmo tipo, para que os lotes sejam comparáveis.
+    """
+    import pyarrow as pa
+
+    df = _texto_preservando_nulos(df.copy(), [col for col in df.columns if df[col].dtype == object])
+    esquema = pa.Table.from_pandas(df, preserve_index=False).schema.remove_metadata()
+    return pa.schema([
+        pa.field(campo.name, pa.string()) if pa.types.is_large_string(campo.type) else campo
+        for campo in esquema
+    ])
+
+
+def _tabela_lote(df, esquema):
+    """Converte um lote de linhas para uma tabela Arrow com o esquema informado."""
+    import pyarrow as pa
+
+    colunas_texto = [campo.name for campo in esquema if pa.types.is_string(campo.type)]
+    df = _texto_preservando_nulos(df.copy(), colunas_texto)
+    return pa.Table.from_pandas(df, schema=esquema, preserve_index=False)
+
+
+def _unificar_esquemas(esquema_atual, esquema_lote):
+    """
+    Une o esquema gravado até agora com o de um novo lote, coluna a coluna.
+    Tipos numéricos são promovidos (ex: int -> double) e colunas vazias assumem o tipo
+    do lote; tipos incompatíveis (ex: números e textos na mesma coluna) viram texto.
+    """
+    import pyarrow as pa
+
+    campos = []
+    for atual, novo in zip(esquema_atual, esquema_lote):
+        try:
+            tipo = pa.unify_schemas([pa.schema([atual]), pa.schema([novo])],
+                                    promote_options="permissive").field(0).type
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            tipo = pa.string()
+        campos.append(pa.field(atual.name, tipo))
+    return pa.schema(campos)
+
+
+def _copiar_row_groups(caminho_parquet, writer):
+    """Copia, row group a row group, um Parquet já gravado para o esquema do writer."""
+    import pyarrow.parquet as pq
+
+    arquivo = pq.ParquetFile(caminho_parquet)
+    for i in range(arquivo.num_row_groups):
+        writer.write_table(_tabela_lote(arquivo.read_row_group(i).to_pandas(), writer.schema))
+
+
+def _gravar_lote(df, writer, caminho_parquet):
+    """
+    Grava um lote como um row group do Parquet em construção e retorna o writer em uso.
+    Se o lote trouxer um tipo novo para alguma coluna (ex: texto em coluna numérica),
+    os lotes já gravados são copiados para um novo arquivo com o tipo promovido.
+    """
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_lote(df)
+    if writer is None:
+        writer = pq.ParquetWriter(caminho_parquet, esquema)
+    elif not esquema.equals(writer.schema):
+        esquema = _unificar_esquemas(writer.schema, esquema)
+        if not esquema.equals(writer.schema):
+            writer.close()
+            anterior = caminho_parquet + ".anterior"
+            os.replace(caminho_parquet, anterior)
+            writer = pq.ParquetWriter(caminho_parquet, esquema)
+            _copiar_row_groups(anterior, writer)
+            os.remove(anterior)
+
+    writer.write_table(_tabela_lote(df, writer.schema))
+    return writer
+
+
+def gravar_excel_em_fluxo(caminho_arquivo, colunas=COLUNAS_NECESSARIAS, linhas_por_lote=LINHAS_POR_LOTE):
+    """
+    Lê a primeira planilha linha a linha (modo somente leitura do openpyxl) e grava
+    as colunas necessárias no cache Parquet em lotes de `linhas_por_lote` linhas,
+    de modo que apenas um lote fica em memória.
+    """
+    if caminho_arquivo.lower().endswith('.xls'):
+        # O openpyxl não lê o formato binário antigo; restringimos as colunas via usecols
+        df = pd.read_excel(caminho_arquivo, usecols=lambda c: normalizar_nome_coluna(c) in colunas)
+        df.columns = [normalizar_nome_coluna(col) for col in df.columns]
+        salvar_cache(df, caminho_arquivo)
+        return
+
+    from openpyxl import load_workbook
+
+    cache = caminho_cache(caminho_arquivo)
+    os.makedirs(os.path.dirname(cache), exist_ok=True)
+    temporario = cache + ".tmp"
+
+    wb = load_workbook(caminho_arquivo, read_only=True, data_only=True)
+    writer = None
+    try:
+        linhas = wb.worksheets[0].iter_rows(values_only=True)
+        cabecalho = next(linhas, None) or ()
+
+        # Mapeia posição -> nome normalizado (mantém a primeira ocorrência de nomes repetidos)
+        indices = []
+        for i, col in enumerate(cabecalho):
+            nome = normalizar_nome_coluna(col)
+            if col is not None and nome in colunas and nome not in [n for _, n in indices]:
+                indices.append((i, nome))
+        nomes = [nome for _, nome in indices]
+
+        lote = []
+        for linha in linhas:
+            lote.append([linha[i] if i < len(linha) else None for i, _ in indices])
+            if len(lote) >= linhas_por_lote:
+                writer = _gravar_lote(pd.DataFrame(lote, columns=nomes).infer_objects(), writer, temporario)
+                lote = []
+
+        # Último lote incompleto (ou planilha sem linhas de dados)
+        if lote or writer is None:
+            writer = _gravar_lote(pd.DataFrame(lote, columns=nomes).infer_objects(), writer, temporario)
+    except Exception:
+        # Não deixa um Parquet incompleto para trás
+        if writer is not None:
+            writer.close()
+            writer = None
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+        wb.close()
+
+    os.replace(temporario, cache)
+
+
+def ler_csv_colunas(caminho_arquivo, colunas=COLUNAS_NECESSARIAS):
+    """Lê um CSV/TXT completo, restrito às colunas necessárias."""
+    filtro = lambda c: normalizar_nome_coluna(c) in colunas
+    try:
+        df = pd.read_csv(caminho_arquivo, sep=';', encoding='latin1', usecols=filtro, low_memory=False)
+    except:
+        df = pd.read_csv(caminho_arquivo, sep=',', encoding='utf-8', usecols=filtro, low_memory=False)
+    df.columns = [normalizar_nome_coluna(col) for col in df.columns]
+    return df
+
+
+def carregar_colunar(caminho_arquivo):
+    """
+    Retorna o conteúdo do arquivo (CSV/TXT/Excel) em formato colunar.
+    O arquivo bruto só é lido na primeira chamada; as seguintes usam o cache Parquet.
+    Retorna None para extensões não suportadas.
+    """
+    nome = caminho_arquivo.lower()
+    if not nome.endswith(('.csv', '.txt', '.xlsx', '.xls')):
+        return None
+
+    df = ler_cache(caminho_arquivo)
+    if df is not None:
+        return df
+
+    if nome.endswith(('.xlsx', '.xls')):
+        try:
+            # A planilha vai direto para o cache, lote a lote, e é lida de volta já colunar
+            gravar_excel_em_fluxo(caminho_arquivo)
+            return pd.read_parquet(caminho_cache(caminho_arquivo))
+        except ImportError as e:
+            # Sem pyarrow não há cache: a planilha é lida inteira em memória
+            print(f"Aviso: não foi possível gravar o cache colunar de {os.path.basename(caminho_arquivo)}: {e}")
+            df = pd.read_excel(caminho_arquivo, usecols=lambda c: normalizar_nome_coluna(c) in COLUNAS_NECESSARIAS)
+            df.columns = [normalizar_nome_coluna(col) for col in df.columns]
+            return df
+
+    df = ler_csv_colunas(caminho_arquivo)
+    try:
+        salvar_cache(df, caminho_arquivo)
+    except Exception as e:
+        # Falha no cache não impede o processamento (ex: pyarrow ausente)
+        print(f"Aviso: não foi possível gravar o cache colunar de {os.path.basename(caminho_arquivo)}: {e}")
+
+    return df
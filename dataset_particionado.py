@@ -0,0 +1,358 @@
+import argparse
+import bisect
+import json
+import os
+import re
+import shutil
+
+import pandas as pd
+
+# Configurações de Caminhos
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASTA_DATASET = os.path.join(BASE_DIR, "dados_particionados")
+TABELA_CONSOLIDADO = os.path.join(PASTA_DATASET, "consolidado_despesas")
+TABELA_ENRIQUECIDO = os.path.join(PASTA_DATASET, "consolidado_enriquecido")
+TABELA_INCONSISTENCIAS = os.path.join(PASTA_DATASET, "relatorio_inconsistencias")
+
+COLUNAS_PARTICAO = ['Ano', 'Trimestre']
+ARQUIVO_DADOS = "dados.parquet"
+# Arquivos iniciados por "_" são ignorados por leitores Parquet genéricos (ex: pyarrow.dataset)
+ARQUIVO_INDICE = "_indice.json"
+
+# Registra as partições gravadas pela última execução de gravar_tabela
+ARQUIVO_MANIFESTO = "_ultima_gravacao.json"
+
+# Linhas por row group: é a menor unidade lida quando o índice de CNPJ é usado
+LINHAS_POR_GRUPO = 10000
+# Ordem das linhas dentro da partição. A UF vem primeiro e cada UF ocupa seus próprios
+# row groups, para que consultas por UF leiam só os grupos daquela UF.
+COLUNAS_ORDENACAO = ['UF', 'CNPJ']
+COLUNA_AGRUPAMENTO = 'UF'
+
+
+def ler_trimestre(texto):
+    """Converte 'AAAA-T' (ex: 2010-1) em uma tupla (ano, trimestre)."""
+    match = re.fullmatch(r"(\d{4})-([1-4])", texto.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Trimestre inválido: '{texto}'. Use o formato AAAA-T (ex: 2010-1).")
+    return int(match.group(1)), int(match.group(2))
+
+
+def caminho_particao(pasta_tabela, ano, trimestre):
+    """Pasta da partição no formato Ano=AAAA/Trimestre=T."""
+    return os.path.join(pasta_tabela, f"Ano={ano}", f"Trimestre={trimestre}")
+
+
+def _valor_json(valor):
+    """Converte escalares numpy/pandas para tipos aceitos pelo JSON."""
+    return valor.item() if hasattr(valor, 'item') else valor
+
+
+def _estatisticas_colunas(df):
+    """Calcula mínimo e máximo de cada coluna (ignorando valores ausentes)."""
+    estatisticas = {}
+    for col in df.columns:
+        serie = df[col].dropna()
+        if serie.empty:
+            estatisticas[col] = {'min': None, 'max': None}
+        else:
+            estatisticas[col] = {'min': _valor_json(serie.min()), 'max': _valor_json(serie.max())}
+    return estatisticas
+
+
+def _indice_cnpj(df):
+    """
+    Mapeia cada CNPJ para os intervalos [início, fim) de linhas que ocupa.
+    Com a ordenação por UF e CNPJ, um CNPJ só ocupa mais de um intervalo se aparecer em mais de uma UF.
+    """
+    if 'CNPJ' not in df.columns:
+        return {}
+
+    cnpjs = df['CNPJ'].astype(str)
+    inicios = (cnpjs != cnpjs.shift()).to_numpy().nonzero()[0].tolist()
+    fins = inicios[1:] + [len(df)]
+
+    indice = {}
+    for inicio, fim in zip(inicios, fins):
+        indice.setdefault(cnpjs.iat[inicio], []).append([inicio, fim])
+    return indice
+
+
+def _limites_grupos(df):
+    """
+    Calcula a linha inicial de cada row group: um novo grupo começa a cada mudança
+    de UF e a cada LINHAS_POR_GRUPO linhas dentro da mesma UF.
+    """
+    if len(df) == 0:
+        return [0]
+
+    if COLUNA_AGRUPAMENTO in df.columns:
+        valores = df[COLUNA_AGRUPAMENTO].astype(str)
+        trocas = (valores != valores.shift()).to_numpy().nonzero()[0].tolist()
+    else:
+        trocas = [0]
+
+    inicios = []
+    for inicio, fim in zip(trocas, trocas[1:] + [len(df)]):
+        inicios.extend(range(inicio, fim, LINHAS_POR_GRUPO))
+    return inicios
+
+
+def gravar_particao(df, pasta_tabela, ano, trimestre):
+    """
+    Grava (substituindo) uma partição: um arquivo Parquet ordenado por UF e CNPJ e
+    o índice com estatísticas min/max e os intervalos de linhas de cada CNPJ.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    df = df.drop(columns=[c for c in COLUNAS_PARTICAO if c in df.columns])
+
+    # Colunas com tipos mistos não são aceitas pelo Parquet; convertemos para texto
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+
+    ordenacao = [c for c in COLUNAS_ORDENACAO if c in df.columns]
+    if ordenacao:
+        df = df.sort_values(ordenacao, kind='stable')
+    df = df.reset_index(drop=True)
+
+    # Grava em uma pasta temporária e troca de uma vez, para nunca expor partição incompleta
+    destino = caminho_particao(pasta_tabela, ano, trimestre)
+    temporario = os.path.join(pasta_tabela, f"_tmp_{ano}_{trimestre}")
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+
+    # Cada fatia vira um row group, com estatísticas min/max próprias no rodapé do Parquet
+    inicio_grupos = _limites_grupos(df)
+    tabela = pa.Table.from_pandas(df, preserve_index=False)
+    with pq.ParquetWriter(os.path.join(temporario, ARQUIVO_DADOS), tabela.schema) as escritor:
+        for inicio, fim in zip(inicio_grupos, inicio_grupos[1:] + [len(df)]):
+            escritor.write_table(tabela.slice(inicio, fim - inicio))
+
+    indice = {
+        'arquivo': ARQUIVO_DADOS,
+        'num_linhas': len(df),
+        'inicio_grupos': inicio_grupos,
+        'estatisticas': _estatisticas_colunas(df),
+        'cnpj': _indice_cnpj(df)
+    }
+    with open(os.path.join(temporario, ARQUIVO_INDICE), 'w', encoding='utf-8') as f:
+        json.dump(indice, f, ensure_ascii=False)
+
+    shutil.rmtree(destino, ignore_errors=True)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    os.replace(temporario, destino)
+
+
+def gravar_tabela(df, pasta_tabela):
+    """
+    Grava o DataFrame particionado por Ano/Trimestre, substituindo apenas as partições presentes.
+    Ao final registra no manifesto quais partições foram gravadas, permitindo que os leitores
+    usem só o resultado desta execução (e não o histórico de execuções anteriores).
+    """
+    particoes = []
+    for (ano, trimestre), df_particao in df.groupby(COLUNAS_PARTICAO):
+        gravar_particao(df_particao, pasta_tabela, int(ano), int(trimestre))
+        particoes.append([int(ano), int(trimestre)])
+
+    manifesto = os.path.join(pasta_tabela, ARQUIVO_MANIFESTO)
+    os.makedirs(pasta_tabela, exist_ok=True)
+    with open(manifesto + ".tmp", 'w', encoding='utf-8') as f:
+        json.dump({'particoes': particoes}, f)
+    os.replace(manifesto + ".tmp", manifesto)
+
+
+def ler_manifesto(pasta_tabela):
+    """
+    Retorna (partições, data de modificação) da última execução de gravar_tabela,
+    ou None se a tabela não tiver manifesto.
+    """
+    manifesto = os.path.join(pasta_tabela, ARQUIVO_MANIFESTO)
+    if not os.path.exists(manifesto):
+        return None
+
+    with open(manifesto, encoding='utf-8') as f:
+        particoes = [tuple(p) for p in json.load(f)['particoes']]
+    return particoes, os.path.getmtime(manifesto)
+
+
+def listar_particoes(pasta_tabela, inicio=None, fim=None):
+    """
+    Lista as partições (ano, trimestre, pasta) da tabela em ordem cronológica,
+    descartando pelo caminho as que estão fora do intervalo [inicio, fim].
+    """
+    particoes = []
+    if not os.path.isdir(pasta_tabela):
+        return particoes
+
+    for pasta_ano in os.listdir(pasta_tabela):
+        match_ano = re.fullmatch(r"Ano=(\d{4})", pasta_ano)
+        if not match_ano:
+            continue
+
+        for pasta_tri in os.listdir(os.path.join(pasta_tabela, pasta_ano)):
+            match_tri = re.fullmatch(r"Trimestre=(\d)", pasta_tri)
+            if not match_tri:
+                continue
+
+            chave = (int(match_ano.group(1)), int(match_tri.group(1)))
+            if (inicio and chave < inicio) or (fim and chave > fim):
+                continue
+            particoes.append((chave[0], chave[1], os.path.join(pasta_tabela, pasta_ano, pasta_tri)))
+
+    return sorted(particoes)
+
+
+def _normalizar_filtros(filtros, estatisticas):
+    """
+    Converte os valores dos filtros para o tipo armazenado em cada coluna
+    (ex: CNPJ informado como número é comparado como texto).
+    """
+    normalizados = {}
+    for col, valores in filtros.items():
+        referencia = (estatisticas.get(col) or {}).get('min')
+        if col == 'CNPJ' or isinstance(referencia, str):
+            normalizados[col] = [str(v) for v in valores]
+        elif isinstance(referencia, (int, float)):
+            normalizados[col] = [float(v) if isinstance(v, str) else v for v in valores]
+        else:
+            normalizados[col] = list(valores)
+    return normalizados
+
+
+def _pode_conter(estatisticas, filtros):
+    """Usa o min/max das colunas para descartar arquivos que não podem satisfazer os filtros."""
+    for col, valores in filtros.items():
+        est = estatisticas.get(col)
+        if not est or est['min'] is None:
+            return False
+        if not any(est['min'] <= valor <= est['max'] for valor in valores):
+            return False
+    return True
+
+
+def _grupos_por_estatisticas(arquivo, filtros):
+    """Usa as estatísticas min/max de cada row group do Parquet para descartar os que não servem."""
+    nomes = arquivo.schema_arrow.names
+    grupos = []
+    for g in range(arquivo.num_row_groups):
+        meta = arquivo.metadata.row_group(g)
+        manter = True
+        for col, valores in filtros.items():
+            est = meta.column(nomes.index(col)).statistics
+            if est is not None and est.has_min_max and \
+                    not any(est.min <= valor <= est.max for valor in valores):
+                manter = False
+                break
+        if manter:
+            grupos.append(g)
+    return grupos
+
+
+def _grupos_por_cnpj(indice, cnpjs):
+    """Retorna os row groups que contêm os CNPJs pedidos, segundo o índice."""
+    inicio_grupos = indice['inicio_grupos']
+    grupos = set()
+    for cnpj in cnpjs:
+        for inicio, fim in indice['cnpj'].get(str(cnpj), []):
+            primeiro = bisect.bisect_right(inicio_grupos, inicio) - 1
+            ultimo = bisect.bisect_right(inicio_grupos, fim - 1) - 1
+            grupos.update(range(primeiro, ultimo + 1))
+    return grupos
+
+
+def iterar_tabela(pasta_tabela, colunas=None, inicio=None, fim=None, filtros=None, metricas=None,
+                  particoes=None):
+    """
+    Lê a tabela partição por partição, gerando um DataFrame por partição.
+
+    - inicio/fim: tuplas (ano, trimestre); partições fora do intervalo nem são abertas.
+    - particoes: lista opcional de (ano, trimestre) a ler (ex: as do manifesto).
+    - colunas: apenas estas colunas são lidas do disco (Ano/Trimestre vêm do caminho).
+    - filtros: dicionário coluna -> lista de valores aceitos (igualdade). Arquivos e row
+      groups cujo min/max não comporta nenhum valor são pulados; o filtro por CNPJ usa
+      o índice para ler apenas os row groups necessários.
+    - metricas: dicionário opcional que recebe partições totais/lidas e bytes lidos.
+    """
+    import pyarrow.parquet as pq
+
+    filtros = {col: list(valores) for col, valores in (filtros or {}).items()}
+    # Ano/Trimestre vêm do caminho da partição como inteiros (ex: '2024' -> 2024)
+    for col in COLUNAS_PARTICAO:
+        if col in filtros:
+            filtros[col] = [int(v) for v in filtros[col]]
+    filtros_arquivo = {col: valores for col, valores in filtros.items() if col not in COLUNAS_PARTICAO}
+
+    if metricas is not None:
+        arquivos_dados = [os.path.join(pasta, ARQUIVO_DADOS) for _, _, pasta in listar_particoes(pasta_tabela)]
+        metricas.update({
+            'particoes_total': len(arquivos_dados),
+            'particoes_lidas': 0,
+            'bytes_total': sum(os.path.getsize(a) for a in arquivos_dados if os.path.exists(a)),
+            'bytes_lidos': 0
+        })
+
+    selecionadas = set(particoes) if particoes is not None else None
+
+    for ano, trimestre, pasta in listar_particoes(pasta_tabela, inicio, fim):
+        if selecionadas is not None and (ano, trimestre) not in selecionadas:
+            continue
+        if 'Ano' in filtros and ano not in filtros['Ano']:
+            continue
+        if 'Trimestre' in filtros and trimestre not in filtros['Trimestre']:
+            continue
+
+        caminho_indice = os.path.join(pasta, ARQUIVO_INDICE)
+        if not os.path.exists(caminho_indice):
+            # Partição vazia (ex: trimestre sem dados relevantes no backfill)
+            continue
+
+        with open(caminho_indice, encoding='utf-8') as f:
+            indice = json.load(f)
+
+        filtros_particao = _normalizar_filtros(filtros_arquivo, indice['estatisticas'])
+        if not _pode_conter(indice['estatisticas'], filtros_particao):
+            continue
+
+        arquivo = pq.ParquetFile(os.path.join(pasta, indice['arquivo']))
+        grupos = _grupos_por_estatisticas(arquivo, filtros_particao)
+        if 'CNPJ' in filtros_particao and indice.get('cnpj'):
+            grupos = sorted(set(grupos) & _grupos_por_cnpj(indice, filtros_particao['CNPJ']))
+        if not grupos:
+            continue
+
+        colunas_arquivo = arquivo.schema_arrow.names
+        colunas_leitura = [c for c in colunas_arquivo
+                           if colunas is None or c in colunas or c in filtros_particao]
+
+        if metricas is not None:
+            metricas['particoes_lidas'] += 1
+            for g in grupos:
+                for c in range(arquivo.metadata.num_columns):
+                    coluna_meta = arquivo.metadata.row_group(g).column(c)
+                    if coluna_meta.path_in_schema in colunas_leitura:
+                        metricas['bytes_lidos'] += coluna_meta.total_compressed_size
+
+        df = arquivo.read_row_groups(grupos, columns=colunas_leitura).to_pandas()
+
+        # Filtro exato (o min/max e o índice apenas descartam o que certamente não serve)
+        for col, valores in filtros_particao.items():
+            df = df[df[col].isin(valores)]
+
+        df['Ano'] = ano
+        df['Trimestre'] = trimestre
+        if colunas is not None:
+            df = df[[c for c in colunas if c in df.columns]]
+
+        yield df.reset_index(drop=True)
+
+
+def ler_tabela(pasta_tabela, colunas=None, inicio=None, fim=None, filtros=None, metricas=None,
+               particoes=None):
+    """Lê a tabela inteira (respeitando os filtros) em um único DataFrame."""
+    partes = list(iterar_tabela(pasta_tabela, colunas, inicio, fim, filtros, metricas, particoes))
+    if not partes:
+        return pd.DataFrame(columns=colunas)
+    return pd.concat(partes, ignore_index=True)
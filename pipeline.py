@@ -0,0 +1,220 @@
+import argparse
+import importlib
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataset_particionado import TABELA_CONSOLIDADO
+
+# Os scripts das etapas começam com dígito, por isso são importados via importlib
+etapa_download = importlib.import_module("1_1")
+etapa_extracao = importlib.import_module("1_2")
+etapa_consolidacao = importlib.import_module("1_3")
+
+# Configurações de Caminhos
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PASTA_DOWNLOADS = os.path.join(BASE_DIR, "trimestres_baixados")
+PASTA_EXTRAIDOS = os.path.join(PASTA_DOWNLOADS, "trimestres_extraidos")
+
+# Tamanho das filas entre as etapas (limita ZIPs/arquivos pendentes em disco e memória)
+TAMANHO_FILA = 2
+NUM_AGREGADORES = 4
+
+# Marcador de fim de fluxo enviado de uma etapa para a seguinte
+FIM = None
+
+# Intervalo (s) em que as etapas bloqueadas numa fila verificam se o pipeline foi interrompido
+INTERVALO_ESPERA = 0.5
+
+
+def colocar(fila, item, parar):
+    """
+    Coloca o item na fila, esperando por espaço enquanto o pipeline não for interrompido.
+    Retorna False se o pipeline foi interrompido (a etapa seguinte não consome mais a fila).
+    """
+    while not parar.is_set():
+        try:
+            fila.put(item, timeout=INTERVALO_ESPERA)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def retirar(fila, parar):
+    """Retira o próximo item da fila; retorna FIM se o pipeline for interrompido."""
+    while not parar.is_set():
+        try:
+            return fila.get(timeout=INTERVALO_ESPERA)
+        except queue.Empty:
+            pass
+    return FIM
+
+
+def executar_etapa(parar, etapa, *args):
+    """Executa uma etapa; se ela falhar, interrompe as demais para o erro chegar ao chamador."""
+    try:
+        return etapa(*args)
+    except BaseException:
+        parar.set()
+        raise
+
+
+def etapa_baixar(links, fila_zips, pasta, parar):
+    """Produtor: baixa os ZIPs um a um e entrega cada um à extração assim que termina."""
+    try:
+        for link in links:
+            print(f"Baixando: {link}")
+            try:
+                caminho_zip = etapa_download.baixar_trimestres(link, pasta)
+            except Exception as e:
+                print(f"Erro ao baixar {link}: {e}")
+                continue
+            if not colocar(fila_zips, caminho_zip, parar):
+                return
+    finally:
+        colocar(fila_zips, FIM, parar)
+
+
+def etapa_extrair(fila_zips, fila_membros, pasta_destino, parar):
+    """Extrai cada ZIP recebido e repassa os arquivos extraídos aos agregadores."""
+    try:
+        while True:
+            caminho_zip = retirar(fila_zips, parar)
+            if caminho_zip is FIM:
+                break
+
+            if not zipfile.is_zipfile(caminho_zip):
+                print(f"Ignorando arquivo que não é ZIP: {os.path.basename(caminho_zip)}")
+                continue
+
+            print(f"Extraindo: {os.path.basename(caminho_zip)}")
+            try:
+                membros = etapa_extracao.extrair_zip(caminho_zip, pasta_destino)
+            except Exception as e:
+                print(f"Erro ao extrair {os.path.basename(caminho_zip)}: {e}")
+                continue
+            for membro in membros:
+                if not colocar(fila_membros, membro, parar):
+                    return
+    finally:
+        colocar(fila_membros, FIM, parar)
+
+
+def agregar_membro(caminho):
+    """
+    Valida um arquivo extraído (removendo-o se for irrelevante) e agrega suas despesas.
+    Executado em um processo do pool de agregação; retorna o DataFrame agregado ou None.
+    """
+    try:
+        if not etapa_extracao.validar_arquivo(caminho):
+            return None
+        return etapa_consolidacao.processar_arquivo_dados(caminho, os.path.basename(caminho))
+    except Exception as e:
+        # Um arquivo com erro não pode interromper o consumo da fila
+        print(f"Erro ao agregar {os.path.basename(caminho)}: {e}")
+        return None
+
+
+def etapa_agregar(fila_membros, executor, limite, parar):
+    """
+    Consumidor: envia cada arquivo extraído ao pool de processos de agregação.
+    A leitura e o groupby do pandas são limitados por CPU, por isso usam processos
+    (e não threads, serializadas pelo GIL). No máximo `limite` arquivos ficam em
+    processamento ao mesmo tempo. Retorna a lista de DataFrames agregados.
+    Se um processo do pool morrer (ex: falta de memória), a exceção BrokenProcessPool
+    é propagada.
+    """
+    vagas = threading.BoundedSemaphore(limite)
+    futuros = []
+    while True:
+        caminho = retirar(fila_membros, parar)
+        if caminho is FIM:
+            break
+
+        vaga = vagas.acquire(timeout=INTERVALO_ESPERA)
+        while not vaga and not parar.is_set():
+            vaga = vagas.acquire(timeout=INTERVALO_ESPERA)
+        if not vaga:
+            break
+
+        futuro = executor.submit(agregar_membro, caminho)
+        futuro.add_done_callback(lambda _: vagas.release())
+        futuros.append(futuro)
+
+    resultados = [futuro.result() for futuro in futuros]
+    return [df for df in resultados if df is not None]
+
+
+def executar_pipeline(base_url=etapa_download.BASE_URL, tamanho_fila=TAMANHO_FILA,
+                      num_agregadores=NUM_AGREGADORES,
+                      arquivo_saida=etapa_consolidacao.ARQUIVO_SAIDA_CSV,
+                      url_cadop=etapa_consolidacao.URL_CADOP, pasta_tabela=TABELA_CONSOLIDADO):
+    """
+    Executa download -> extração -> consolidação de forma sobreposta, com filas
+    limitadas entre as etapas. Retorna True se o consolidado foi gerado.
+    """
+    inicio = time.time()
+    print("Iniciando pipeline sobreposto (download -> extração -> consolidação)...")
+
+    links = etapa_download.trimestres_encontrados(base_url)
+    if not links:
+        print("Nenhum trimestre encontrado.")
+        return False
+
+    os.makedirs(PASTA_EXTRAIDOS, exist_ok=True)
+
+    fila_zips = queue.Queue(maxsize=tamanho_fila)
+    fila_membros = queue.Queue(maxsize=tamanho_fila * num_agregadores)
+
+    # "spawn" evita fazer fork do processo enquanto as threads das etapas estão ativas
+    contexto = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=num_agregadores, mp_context=contexto) as pool_agregacao, \
+            ThreadPoolExecutor(max_workers=4) as executor:
+        # O CADOP é carregado em paralelo às etapas, pois só é usado no final
+        futuro_cadop = executor.submit(etapa_consolidacao.carregar_cadop, url_cadop)
+        # Se uma etapa falhar, as outras param de esperar pelas filas e a exceção é propagada
+        parar = threading.Event()
+        futuro_download = executor.submit(executar_etapa, parar, etapa_baixar,
+                                          links, fila_zips, PASTA_DOWNLOADS, parar)
+        futuro_extracao = executor.submit(executar_etapa, parar, etapa_extrair,
+                                          fila_zips, fila_membros, PASTA_EXTRAIDOS, parar)
+        futuro_agregacao = executor.submit(executar_etapa, parar, etapa_agregar, fila_membros,
+                                           pool_agregacao, tamanho_fila * num_agregadores, parar)
+
+        dados_consolidados = futuro_agregacao.result()
+        futuro_download.result()
+        futuro_extracao.result()
+        cadop = futuro_cadop.result()
+
+    if not dados_consolidados:
+        print("Nenhum dado relevante encontrado para consolidação.")
+        return False
+
+    etapa_consolidacao.consolidar_e_salvar(dados_consolidados, cadop, arquivo_saida, pasta_tabela)
+    print(f"Pipeline concluído em {time.time() - inicio:.1f}s.")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa as etapas 1.1 a 1.3 de forma sobreposta.")
+    parser.add_argument("--url", default=etapa_download.BASE_URL,
+                        help="URL base das demonstrações contábeis (ex: servidor HTTP local para testes)")
+    parser.add_argument("--fila", type=int, default=TAMANHO_FILA,
+                        help="Tamanho máximo das filas entre as etapas")
+    parser.add_argument("--agregadores", type=int, default=NUM_AGREGADORES,
+                        help="Número de processos de agregação")
+    parser.add_argument("--cadop", default=etapa_consolidacao.URL_CADOP,
+                        help="URL do Relatorio_cadop.csv (usado apenas se o arquivo local não existir)")
+    parser.add_argument("--saida", default=etapa_consolidacao.ARQUIVO_SAIDA_CSV,
+                        help="Caminho do CSV consolidado")
+    args = parser.parse_args()
+
+    executar_pipeline(args.url, args.fila, args.agregadores, args.saida, args.cadop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import functools
+import io
+import os
+import sys
+import threading
+import zipfile
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+# Os scripts ficam na raiz do repositório (fora de um pacote)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def criar_zip(caminho, nome_membro, df):
+    buffer = io.StringIO()
+    df.to_csv(buffer, sep=';', index=False)
+    with zipfile.ZipFile(caminho, 'w') as zip_ref:
+        zip_ref.writestr(nome_membro, buffer.getvalue())
+        zip_ref.writestr("leiame.txt", "sem dados\n")
+
+
+@pytest.fixture
+def servidor_ans(tmp_path):
+    """Servidor HTTP local com a mesma estrutura de pastas da ANS."""
+    raiz = tmp_path / "servidor"
+    (raiz / "2024").mkdir(parents=True)
+
+    for trimestre in (1, 2):
+        df = pd.DataFrame({
+            'DATA': [f"2024-{trimestre * 3:02d}-01"] * 3,
+            'REG_ANS': [111, 222, 111],
+            'DESCRICAO': ['EVENTOS INDENIZÁVEIS', 'EVENTOS/SINISTROS', 'RECEITAS'],
+            'VL_SALDO_INICIAL': [10.0, 0.0, 5.0],
+            'VL_SALDO_FINAL': [110.0 * trimestre, 50.0, 99.0]
+        })
+        criar_zip(raiz / "2024" / f"{trimestre}T2024.zip", f"{trimestre}T2024.csv", df)
+
+    (raiz / "Relatorio_cadop.csv").write_text(
+        "REGISTRO_OPERADORA;CNPJ;Razao_Social;Modalidade;UF\n"
+        "111;11222333000181;OPERADORA A;Cooperativa Médica;SP\n"
+        "222;44555666000199;OPERADORA B;Autogestão;RJ\n",
+        encoding='utf-8'
+    )
+
+    handler = functools.partial(SimpleHTTPRequestHandler, directory=str(raiz))
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=servidor.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{servidor.server_address[1]}/"
+    servidor.shutdown()
+    servidor.server_close()
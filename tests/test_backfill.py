@@ -0,0 +1,65 @@
+import os
+
+import backfill
+import dataset_particionado as dp
+
+
+def configurar_cadop(tmp_path, monkeypatch):
+    pasta_cadop = tmp_path / "relatorio_cadop"
+    for modulo in (backfill.etapa_consolidacao, backfill.etapa_enriquecimento):
+        monkeypatch.setattr(modulo, "PASTA_CADOP", str(pasta_cadop))
+        monkeypatch.setattr(modulo, "ARQUIVO_CADOP", str(pasta_cadop / "Relatorio_cadop.csv"))
+    return pasta_cadop / "Relatorio_cadop.csv"
+
+
+def test_backfill_valida_enriquece_e_retoma(servidor_ans, tmp_path, monkeypatch):
+    configurar_cadop(tmp_path, monkeypatch)
+
+    pasta_dataset = str(tmp_path / "dados_particionados")
+    falhas = backfill.executar_backfill((2024, 1), (2024, 4), servidor_ans, pasta_dataset, num_workers=2,
+                                        url_cadop=servidor_ans + "Relatorio_cadop.csv")
+    assert falhas == 0
+
+    pastas = backfill.pastas_tabelas(pasta_dataset)
+
+    # Apenas o CNPJ válido chega ao dataset enriquecido, já com a UF do cadastro
+    enriquecido = dp.ler_tabela(pastas['enriquecido'], ['CNPJ', 'UF', 'ValorDespesas', 'Ano', 'Trimestre'])
+    enriquecido = enriquecido.sort_values('Trimestre').reset_index(drop=True)
+    assert enriquecido.values.tolist() == [
+        ['11222333000181', 'SP', 100.0, 2024, 1],
+        ['11222333000181', 'SP', 210.0, 2024, 2],
+    ]
+
+    inconsistencias = dp.ler_tabela(pastas['inconsistencias'], ['CNPJ', 'Motivo_Erro'])
+    assert set(inconsistencias['CNPJ']) == {'44555666000199'}
+    assert inconsistencias['Motivo_Erro'].str.contains('CNPJ Inválido').all()
+
+    # Reexecução não reprocessa as partições concluídas
+    assert all(backfill.particao_concluida(pastas['consolidado'], 2024, t) for t in (1, 2))
+    assert backfill.executar_backfill((2024, 1), (2024, 4), servidor_ans, pasta_dataset) == 0
+
+
+def test_reprocessamento_substitui_o_trimestre_em_todas_as_tabelas(servidor_ans, tmp_path, monkeypatch):
+    arquivo_cadop = configurar_cadop(tmp_path, monkeypatch)
+    pasta_dataset = str(tmp_path / "dados_particionados")
+    pastas = backfill.pastas_tabelas(pasta_dataset)
+    url_cadop = servidor_ans + "Relatorio_cadop.csv"
+
+    assert backfill.executar_backfill((2024, 1), (2024, 1), servidor_ans, pasta_dataset,
+                                      num_workers=1, url_cadop=url_cadop) == 0
+    assert len(dp.ler_tabela(pastas['inconsistencias'])) == 1
+
+    # Trimestre reprocessado com um CADOP corrigido (CNPJ da operadora 222 agora válido)
+    os.remove(os.path.join(dp.caminho_particao(pastas['consolidado'], 2024, 1), backfill.MARCADOR_SUCESSO))
+    arquivo_cadop.write_text(
+        "REGISTRO_OPERADORA;CNPJ;Razao_Social;Modalidade;UF\n"
+        "111;11222333000181;OPERADORA A;Cooperativa Médica;SP\n"
+        "222;11444777000161;OPERADORA B;Autogestão;RJ\n",
+        encoding='utf-8'
+    )
+    assert backfill.executar_backfill((2024, 1), (2024, 1), servidor_ans, pasta_dataset,
+                                      num_workers=1, url_cadop=url_cadop) == 0
+
+    assert dp.listar_particoes(pastas['inconsistencias']) == []
+    enriquecido = dp.ler_tabela(pastas['enriquecido'], ['CNPJ', 'UF'])
+    assert sorted(enriquecido.values.tolist()) == [['11222333000181', 'SP'], ['11444777000161', 'RJ']]
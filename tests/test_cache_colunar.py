@@ -0,0 +1,103 @@
+import importlib
+import os
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import cache_colunar
+
+etapa_consolidacao = importlib.import_module("1_3")
+
+
+def criar_planilha(caminho):
+    """Planilha com valores numéricos e textuais (formato brasileiro) na mesma coluna."""
+    pd.DataFrame({
+        'DATA': ['2024-03-01'] * 4,
+        'REG_ANS': [111, 111, 222, 222],
+        'DESCRICAO': ['EVENTOS INDENIZÁVEIS', 'EVENTOS/SINISTROS', 'EVENTOS/SINISTROS', 'RECEITAS'],
+        'VL_SALDO_INICIAL': [0, 0, 0, 0],
+        'VL_SALDO_FINAL': [100, '1.110,5', 50, 7],
+        'IGNORADA': ['x', 'y', 'z', 'w']
+    }).to_excel(caminho, index=False)
+
+
+def test_cache_nao_altera_o_agregado(tmp_path):
+    planilha = tmp_path / "1T2024.xlsx"
+    criar_planilha(planilha)
+
+    sem_cache = etapa_consolidacao.processar_arquivo_dados(str(planilha), planilha.name)
+    assert (tmp_path / "cache_colunar" / "1T2024.xlsx.parquet").exists()
+    com_cache = etapa_consolidacao.processar_arquivo_dados(str(planilha), planilha.name)
+
+    pd.testing.assert_frame_equal(sem_cache, com_cache)
+    assert dict(zip(com_cache['REG_ANS'], com_cache['ValorDespesas'])) == {111: 1210.5, 222: 50.0}
+
+
+def test_planilha_gravada_em_lotes_igual_a_leitura_completa(tmp_path):
+    planilha = tmp_path / "2T2024.xlsx"
+    pd.DataFrame({
+        'REG_ANS': [111, 222, 333, 444, 555],
+        'DESCRICAO': [None, None, 'EVENTOS', 'EVENTOS', 'SINISTROS'],
+        'VL_SALDO_INICIAL': [1, 2, 3.5, 4, 5],
+        'VL_SALDO_FINAL': [100, 50, '1.110,5', 7, 8],
+    }).to_excel(planilha, index=False)
+
+    # Lotes de 2 linhas: os tipos dos primeiros lotes são promovidos pelos seguintes
+    cache_colunar.gravar_excel_em_fluxo(str(planilha), linhas_por_lote=2)
+    cache = cache_colunar.caminho_cache(str(planilha))
+    assert pq.ParquetFile(cache).num_row_groups == 3
+    em_lotes = pd.read_parquet(cache)
+
+    referencia = str(tmp_path / "referencia.xlsx")
+    cache_colunar.salvar_cache(pd.read_excel(planilha), referencia)
+    completa = pd.read_parquet(cache_colunar.caminho_cache(referencia))
+
+    pd.testing.assert_frame_equal(em_lotes, completa)
+
+
+def test_validacao_grava_cache_reaproveitado_e_invalidado(tmp_path, monkeypatch):
+    etapa_extracao = importlib.import_module("1_2")
+    planilha = tmp_path / "1T2024.xlsx"
+    criar_planilha(planilha)
+
+    assert etapa_extracao.validar_arquivo(str(planilha))
+    cache = tmp_path / "cache_colunar" / "1T2024.xlsx.parquet"
+    assert cache.exists()
+    assert 'IGNORADA' not in pd.read_parquet(cache).columns
+
+    # Cache válido: a planilha não é relida
+    def nao_deve_ler(*args, **kwargs):
+        raise AssertionError("planilha relida apesar do cache")
+    monkeypatch.setattr(cache_colunar, "gravar_excel_em_fluxo", nao_deve_ler)
+    assert len(cache_colunar.carregar_colunar(str(planilha))) == 4
+    monkeypatch.undo()
+
+    # Planilha mais recente que o cache (ex: nova extração): o cache é refeito
+    pd.DataFrame({'REG_ANS': [999], 'DESCRICAO': ['EVENTOS'], 'VL_SALDO_FINAL': [1]}).to_excel(planilha, index=False)
+    os.utime(planilha, (os.path.getmtime(cache) + 10,) * 2)
+    assert cache_colunar.carregar_colunar(str(planilha))['REG_ANS'].tolist() == [999]
+
+
+def test_arquivo_irrelevante_remove_planilha_e_cache(tmp_path):
+    etapa_extracao = importlib.import_module("1_2")
+    planilha = tmp_path / "1T2024.xlsx"
+    pd.DataFrame({'REG_ANS': [111], 'DESCRICAO': ['RECEITAS'], 'VL_SALDO_FINAL': [1]}).to_excel(planilha, index=False)
+
+    assert not etapa_extracao.validar_arquivo(str(planilha))
+    assert not planilha.exists()
+    assert not os.path.exists(cache_colunar.caminho_cache(str(planilha)))
+
+
+def test_xls_usa_read_excel_restrito_as_colunas(tmp_path, monkeypatch):
+    planilha = tmp_path / "1T2024.xls"
+    planilha.write_bytes(b"")
+    bruto = pd.DataFrame({'reg_ans ': [111], 'Descricao': ['EVENTOS'], 'IGNORADA': ['x']})
+
+    # O leitor do formato binário antigo (xlrd) é opcional; simulamos o read_excel
+    def read_excel(caminho, usecols):
+        return bruto[[col for col in bruto.columns if usecols(col)]]
+    monkeypatch.setattr(cache_colunar.pd, "read_excel", read_excel)
+
+    df = cache_colunar.carregar_colunar(str(planilha))
+    assert df.columns.tolist() == ['REG_ANS', 'DESCRICAO']
+    assert os.path.exists(cache_colunar.caminho_cache(str(planilha)))
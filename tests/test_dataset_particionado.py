@@ -0,0 +1,69 @@
+import os
+
+import pandas as pd
+import pytest
+
+import dataset_particionado as dp
+
+
+@pytest.fixture
+def enriquecido():
+    linhas = []
+    for ano, trimestre in [(2023, 4), (2024, 1), (2024, 2)]:
+        for i in range(300):
+            linhas.append({
+                'CNPJ': f"{11111111000100 + i}",
+                'RazaoSocial': f"OPERADORA {i}",
+                'Trimestre': trimestre,
+                'Ano': ano,
+                'ValorDespesas': float(i + ano),
+                'UF': ['SP', 'RJ', 'MG', 'BA'][i % 4]
+            })
+    return pd.DataFrame(linhas)
+
+
+def test_filtro_por_uf_le_apenas_os_row_groups_da_uf(enriquecido, tmp_path):
+    tabela = str(tmp_path / "tabela")
+    dp.gravar_tabela(enriquecido, tabela)
+
+    metricas = {}
+    df = dp.ler_tabela(tabela, ['UF', 'ValorDespesas'], filtros={'UF': ['SP']}, metricas=metricas)
+
+    esperado = enriquecido[enriquecido['UF'] == 'SP']
+    assert len(df) == len(esperado)
+    assert df['ValorDespesas'].sum() == esperado['ValorDespesas'].sum()
+    assert metricas['bytes_lidos'] < metricas['bytes_total'] / 3
+
+
+def test_filtro_por_cnpj_aceita_numero(enriquecido, tmp_path):
+    tabela = str(tmp_path / "tabela")
+    dp.gravar_tabela(enriquecido, tabela)
+
+    df = dp.ler_tabela(tabela, ['CNPJ', 'Ano'], filtros={'CNPJ': [11111111000105]})
+
+    assert df['CNPJ'].tolist() == ['11111111000105'] * 3
+    assert df['Ano'].tolist() == [2023, 2024, 2024]
+
+
+def test_manifesto_registra_apenas_a_ultima_gravacao(enriquecido, tmp_path):
+    tabela = str(tmp_path / "tabela")
+    dp.gravar_tabela(enriquecido, tabela)
+    dp.gravar_tabela(enriquecido[enriquecido['Ano'] == 2024], tabela)
+
+    particoes, _ = dp.ler_manifesto(tabela)
+    assert particoes == [(2024, 1), (2024, 2)]
+
+    df = dp.ler_tabela(tabela, ['Ano', 'Trimestre'], particoes=particoes)
+    assert sorted(set(map(tuple, df.values.tolist()))) == [(2024, 1), (2024, 2)]
+    # O histórico continua disponível para leituras por intervalo
+    assert len(dp.listar_particoes(tabela)) == 3
+    assert not os.path.exists(os.path.join(tabela, "_tmp_2024_1"))
+
+
+def test_filtro_por_ano_e_trimestre_aceita_texto(enriquecido, tmp_path):
+    tabela = str(tmp_path / "tabela")
+    dp.gravar_tabela(enriquecido, tabela)
+
+    df = dp.ler_tabela(tabela, ['CNPJ', 'Ano', 'Trimestre'], filtros={'Ano': ['2024'], 'Trimestre': ['2']})
+    assert len(df) == 300
+    assert set(zip(df['Ano'], df['Trimestre'])) == {(2024, 2)}
@@ -0,0 +1,68 @@
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+
+import pipeline
+
+
+def agregar_e_morrer(caminho):
+    """Simula um processo de agregação encerrado pelo sistema (ex: falta de memória)."""
+    os._exit(1)
+
+
+def configurar_pastas(tmp_path, monkeypatch):
+    pasta_downloads = tmp_path / "trimestres_baixados"
+    monkeypatch.setattr(pipeline, "PASTA_DOWNLOADS", str(pasta_downloads))
+    monkeypatch.setattr(pipeline, "PASTA_EXTRAIDOS", str(pasta_downloads / "trimestres_extraidos"))
+    monkeypatch.setattr(pipeline.etapa_consolidacao, "PASTA_CADOP", str(tmp_path / "relatorio_cadop"))
+    monkeypatch.setattr(pipeline.etapa_consolidacao, "ARQUIVO_CADOP",
+                        str(tmp_path / "relatorio_cadop" / "Relatorio_cadop.csv"))
+
+
+def test_pipeline_com_servidor_local(servidor_ans, tmp_path, monkeypatch):
+    configurar_pastas(tmp_path, monkeypatch)
+
+    arquivo_saida = tmp_path / "consolidado_despesas.csv"
+    assert pipeline.executar_pipeline(
+        servidor_ans, num_agregadores=2, arquivo_saida=str(arquivo_saida),
+        url_cadop=servidor_ans + "Relatorio_cadop.csv", pasta_tabela=str(tmp_path / "tabela")
+    )
+
+    df = pd.read_csv(arquivo_saida, sep=';', dtype={'CNPJ': str})
+    df = df.sort_values(['Trimestre', 'CNPJ']).reset_index(drop=True)
+
+    assert df[['CNPJ', 'RazaoSocial', 'Trimestre', 'Ano']].values.tolist() == [
+        ['11222333000181', 'OPERADORA A', 1, 2024],
+        ['44555666000199', 'OPERADORA B', 1, 2024],
+        ['11222333000181', 'OPERADORA A', 2, 2024],
+        ['44555666000199', 'OPERADORA B', 2, 2024],
+    ]
+    assert df['ValorDespesas'].tolist() == [100.0, 50.0, 210.0, 50.0]
+
+
+def test_pipeline_propaga_falha_de_processo_de_agregacao(servidor_ans, tmp_path, monkeypatch):
+    configurar_pastas(tmp_path, monkeypatch)
+    monkeypatch.setattr(pipeline, "agregar_membro", agregar_e_morrer)
+
+    # Roda em uma thread separada para o teste não travar caso o pipeline fique bloqueado
+    resultado = {}
+
+    def executar():
+        try:
+            pipeline.executar_pipeline(
+                servidor_ans, tamanho_fila=1, num_agregadores=1,
+                arquivo_saida=str(tmp_path / "consolidado_despesas.csv"),
+                url_cadop=servidor_ans + "Relatorio_cadop.csv", pasta_tabela=str(tmp_path / "tabela")
+            )
+        except BaseException as e:
+            resultado['erro'] = e
+
+    thread = threading.Thread(target=executar, daemon=True)
+    thread.start()
+    thread.join(timeout=60)
+
+    assert not thread.is_alive(), "pipeline travou após a morte de um processo de agregação"
+    assert isinstance(resultado.get('erro'), BrokenProcessPool)
+    assert not (tmp_path / "consolidado_despesas.csv").exists()